@@ -1,29 +1,67 @@
+import os
 import customtkinter as ctk
 import tkinter.messagebox as tkmb
-from predictor import predict_reaction
+from predictor import MODEL_PATH, ENCODERS_PATH, predict_reaction, predict_temperature_curve
+from explain import explain_reaction
 
 # --- Configuration ---
 ctk.set_appearance_mode("Dark")
 ctk.set_default_color_theme("dark-blue")
 
+MECHANISM_COLORS = {
+    "SN1": "#1f6aa5",
+    "SN2": "#1f8aa5",
+    "E1": "#a51f1f",
+    "E2": "#a5501f",
+    "No Reaction": "#888888"
+}
+
+# Stereochemistry outcome colours: SN1 racemization shares E1's "stereochemistry lost" colour
+STEREO_COLORS = dict(MECHANISM_COLORS, SN1=MECHANISM_COLORS["E1"])
+
+# Delay between slider-driven redraws, roughly one display frame
+FRAME_DELAY_MS = 16
+
+
+def model_available():
+    return os.path.exists(MODEL_PATH) and os.path.exists(ENCODERS_PATH)
+
+
+def build_input_data(data):
+    return {
+        "Substrate_Degree": data["substrate_degree"],
+        "Leaving_Group": data["leaving_group"],
+        "Nucleophile": data["nucleophile"],
+        "Solvent_Type": data["solvent_type"],
+        "Steric_Hindrance": data["steric_hindrance"],
+        "Temperature": data["temperature"]
+    }
+
 
 def predict(data):
     try:
-        result = predict_reaction(
-            input_data={
-                "Substrate_Degree": data["substrate_degree"],
-                "Leaving_Group": data["leaving_group"],
-                "Nucleophile": data["nucleophile"],
-                "Solvent_Type": data["solvent_type"],
-                "Steric_Hindrance": data["steric_hindrance"],
-                "Temperature": data["temperature"]
-            }
-        )
+        result = predict_reaction(input_data=build_input_data(data))
         return result
     except Exception as e:
         return {"error": str(e)}
 
 
+def predict_curve(data):
+    try:
+        conditions = build_input_data(dict(data, temperature=0.0))
+        del conditions["Temperature"]
+        return predict_temperature_curve(conditions)
+    except Exception as e:
+        return {"error": str(e)}
+
+
+def explain(data, mechanism):
+    try:
+        return explain_reaction(input_data=build_input_data(data), mechanism=mechanism, top_n=3)
+    except Exception as e:
+        return {"error": str(e)}
+
+
 class ReactionPredictorApp(ctk.CTk):
 
     def __init__(self):
@@ -41,7 +79,7 @@ class ReactionPredictorApp(ctk.CTk):
         # --- LEFT SIDEBAR (Inputs) ---
         self.sidebar_frame = ctk.CTkFrame(self, width=350, corner_radius=0)
         self.sidebar_frame.grid(row=0, column=0, sticky="nsew")
-        self.sidebar_frame.grid_rowconfigure(13, weight=1)
+        self.sidebar_frame.grid_rowconfigure(14, weight=1)
 
         self.logo_label = ctk.CTkLabel(
             self.sidebar_frame,
@@ -133,16 +171,39 @@ class ReactionPredictorApp(ctk.CTk):
         # 6. Temperature
         self.lbl_temp = ctk.CTkLabel(
             self.sidebar_frame,
-            text="Temperature (°C):",
+            text="Temperature: 25.0 °C",
             anchor="w"
         )
         self.lbl_temp.grid(row=11, column=0, padx=20, pady=(5, 5), sticky="ew")
 
-        self.entry_temp = ctk.CTkEntry(
+        self.slider_temp = ctk.CTkSlider(
             self.sidebar_frame,
-            placeholder_text="e.g. 25 (0-100°C)"
+            from_=0,
+            to=100,
+            number_of_steps=1000,
+            command=self.on_temperature_change
         )
-        self.entry_temp.grid(row=12, column=0, padx=20, pady=(0, 15), sticky="ew")
+        self.slider_temp.set(25.0)
+        self.slider_temp.grid(row=12, column=0, padx=20, pady=(5, 0), sticky="ew")
+
+        # Crossover temperatures (where the predicted mechanism changes), drawn
+        # on a canvas inside a frame that spans exactly the slider's width
+        self.crossover_frame = ctk.CTkFrame(self.sidebar_frame, height=26, fg_color="transparent")
+        self.crossover_frame.grid(row=13, column=0, padx=20, pady=(0, 15), sticky="ew")
+
+        canvas_bg = self.sidebar_frame.cget("fg_color")
+        if isinstance(canvas_bg, (list, tuple)):
+            canvas_bg = canvas_bg[1] if ctk.get_appearance_mode() == "Dark" else canvas_bg[0]
+
+        self.crossover_canvas = ctk.CTkCanvas(
+            self.crossover_frame,
+            height=26,
+            bg=canvas_bg,
+            highlightthickness=0
+        )
+        self.crossover_canvas.pack(fill="both", expand=True)
+        self.crossover_canvas.bind("<Configure>", lambda event: self.draw_crossovers())
+        self.crossover_font = ctk.CTkFont(size=10, weight="bold")
 
         # Predict Button
         self.btn_predict = ctk.CTkButton(
@@ -152,7 +213,7 @@ class ReactionPredictorApp(ctk.CTk):
             font=ctk.CTkFont(size=14, weight="bold"),
             command=self.run_prediction
         )
-        self.btn_predict.grid(row=13, column=0, padx=20, pady=(0, 30), sticky="ew")
+        self.btn_predict.grid(row=14, column=0, padx=20, pady=(0, 30), sticky="ew")
 
         # --- RIGHT MAIN AREA (Results) ---
         self.main_frame = ctk.CTkFrame(self, corner_radius=0, fg_color="transparent")
@@ -176,7 +237,7 @@ class ReactionPredictorApp(ctk.CTk):
             font=ctk.CTkFont(size=14, weight="bold"),
             text_color="gray"
         )
-        self.lbl_result_title.pack(pady=(40, 10))
+        self.lbl_result_title.pack(pady=(20, 10))
 
         self.lbl_prediction = ctk.CTkLabel(
             self.result_frame,
@@ -192,7 +253,7 @@ class ReactionPredictorApp(ctk.CTk):
             font=ctk.CTkFont(size=14, weight="bold"),
             text_color="gray"
         )
-        self.lbl_stereo_title.pack(pady=(30, 5))
+        self.lbl_stereo_title.pack(pady=(20, 5))
 
         self.lbl_stereo = ctk.CTkLabel(
             self.result_frame,
@@ -201,9 +262,26 @@ class ReactionPredictorApp(ctk.CTk):
         )
         self.lbl_stereo.pack(pady=(0, 20))
 
+        # Key Factors (feature attributions for the predicted mechanism)
+        self.lbl_factors_title = ctk.CTkLabel(
+            self.result_frame,
+            text="KEY FACTORS",
+            font=ctk.CTkFont(size=14, weight="bold"),
+            text_color="gray"
+        )
+        self.lbl_factors_title.pack(pady=(10, 5))
+
+        self.lbl_factors = ctk.CTkLabel(
+            self.result_frame,
+            text="—",
+            font=ctk.CTkFont(size=13),
+            justify="left"
+        )
+        self.lbl_factors.pack(pady=(0, 10))
+
         # Probability Bars
         self.stats_frame = ctk.CTkFrame(self.result_frame, fg_color="transparent")
-        self.stats_frame.pack(fill="x", padx=40, pady=40)
+        self.stats_frame.pack(fill="x", padx=40, pady=20)
 
         self.bars = {}
         self.percentage_labels = {}
@@ -223,6 +301,17 @@ class ReactionPredictorApp(ctk.CTk):
         )
         self.lbl_accuracy.place(relx=0.99, rely=0.99, anchor="se")
 
+        # Live temperature updates: one probability curve per categorical combination
+        self.curve = None
+        self.temperature_job = None
+
+        for var in (self.substrate_var, self.leaving_var, self.nucleophile_var,
+                    self.solvent_var, self.steric_var):
+            var.trace_add("write", lambda *args: self.on_conditions_change())
+
+        # Check for the model once the window is up; live updates wait until it exists
+        self.after(100, self.check_model)
+
     def get_stereochemistry(self, mechanism):
         if mechanism == "SN1":
             return "Racemization (Stereochemistry Lost)"
@@ -235,6 +324,14 @@ class ReactionPredictorApp(ctk.CTk):
         else:
             return "No Change"
 
+    def format_factors(self, explanation):
+        """Formats feature contributions as one line per feature"""
+        lines = []
+        for feature, value, contribution in explanation["contributions"]:
+            name = feature.replace("_", " ")
+            lines.append(f"{name}: {value}   {contribution * 100:+.1f}% toward {explanation['mechanism']}")
+        return "\n".join(lines)
+
     def create_stat_bar(self, key, label_text, color, value=0):
         """Helper to create progress bars with percentage labels"""
         container = ctk.CTkFrame(self.stats_frame, fg_color="transparent")
@@ -254,32 +351,107 @@ class ReactionPredictorApp(ctk.CTk):
         self.percentage_labels[key] = percentage_label
 
     def get_inputs(self):
-        """Validation and retrieval of inputs"""
-        try:
-            # Validate temperature
-            temp = float(self.entry_temp.get())
-            if temp < 0 or temp > 100:
-                tkmb.showwarning("Temperature Warning", "Temperature should be between 0-100°C")
-                return None
-            data = {
-                "substrate_degree": self.substrate_var.get(),
-                "leaving_group": self.leaving_var.get(),
-                "nucleophile": self.nucleophile_var.get(),
-                "solvent_type": self.solvent_var.get(),
-                "steric_hindrance": self.steric_var.get(),
-                "temperature": temp
-            }
-            return data
-        except ValueError:
-            tkmb.showerror("Input Error", "Please ensure Temperature is a valid number.")
-            return None
+        """Retrieval of inputs (the slider keeps temperature within 0-100°C)"""
+        data = {
+            "substrate_degree": self.substrate_var.get(),
+            "leaving_group": self.leaving_var.get(),
+            "nucleophile": self.nucleophile_var.get(),
+            "solvent_type": self.solvent_var.get(),
+            "steric_hindrance": self.steric_var.get(),
+            "temperature": round(float(self.slider_temp.get()), 1)
+        }
+        return data
+
+    def show_model_missing(self):
+        tkmb.showerror(
+            "Model Not Found",
+            "The required machine learning model or label encoders could not be found.\n"
+            "Please train the model first using the training script."
+        )
+
+    def check_model(self):
+        """Start live updates, or tell the user (once) that the model must be trained"""
+        if model_available():
+            self.on_conditions_change()
+        else:
+            self.show_model_missing()
+
+    def on_conditions_change(self):
+        """Fetch the 0-100°C probability curve for the selected conditions (cached by the predictor)"""
+        if not model_available():
+            self.curve = None
+            self.draw_crossovers()
+            return
+
+        curve = predict_curve(self.get_inputs())
+        if "error" in curve:
+            self.curve = None
+            self.draw_crossovers()
+            return
+
+        self.curve = curve
+        self.draw_crossovers()
+        self.apply_temperature()
+
+    def on_temperature_change(self, value):
+        """Slider callback: redraw at most once per frame"""
+        self.lbl_temp.configure(text=f"Temperature: {value:.1f} °C")
+        if self.temperature_job is None:
+            self.temperature_job = self.after(FRAME_DELAY_MS, self.apply_temperature)
+
+    def apply_temperature(self):
+        """Show the cached curve at the current slider temperature"""
+        self.temperature_job = None
+        if self.curve is None:
+            return
+
+        inputs = self.get_inputs()
+        index = int(round(inputs["temperature"] * 10))
+        result = {
+            "prediction": self.curve["predictions"][index],
+            "probabilities": dict(zip(self.curve["classes"], self.curve["probabilities"][index]))
+        }
+        self.show_result(result, inputs)
+
+    def draw_crossovers(self):
+        """Tick every crossover temperature under the slider, labelling those with room"""
+        canvas = self.crossover_canvas
+        canvas.delete("all")
+
+        if self.curve is None:
+            return
+
+        # The slider button travels between inset and width - inset
+        width = canvas.winfo_width()
+        inset = self.slider_temp.winfo_height() / 2
+        if width <= 2 * inset:
+            return
+
+        labelled_up_to = float("-inf")
+        for temperature, _, mechanism in self.curve["crossovers"]:
+            x = inset + (width - 2 * inset) * temperature / 100
+            color = MECHANISM_COLORS.get(mechanism, MECHANISM_COLORS["No Reaction"])
+            canvas.create_line(x, 0, x, 7, fill=color, width=2)
+
+            # Skip the text if it would overlap the previous label
+            text = canvas.create_text(x, 8, text=f"{temperature:g}°", anchor="n",
+                                      fill=color, font=self.crossover_font)
+            left, _, right, _ = canvas.bbox(text)
+            shift = max(0, -left) - max(0, right - width)
+            if left + shift < labelled_up_to + 4:
+                canvas.delete(text)
+                continue
+            canvas.move(text, shift, 0)
+            labelled_up_to = right + shift
 
     def run_prediction(self):
         """Run ML prediction"""
-        inputs = self.get_inputs()
-        if not inputs:
+        if not model_available():
+            self.show_model_missing()
             return
 
+        inputs = self.get_inputs()
+
         result = predict(inputs)
 
         # Check for errors
@@ -287,6 +459,10 @@ class ReactionPredictorApp(ctk.CTk):
             tkmb.showerror("Prediction Error", f"Error: {result['error']}")
             return
 
+        self.show_result(result, inputs)
+
+    def show_result(self, result, inputs):
+        """Update the results panel"""
         # Update probability bars
         for key, value in result["probabilities"].items():
             if key in self.bars:
@@ -301,27 +477,18 @@ class ReactionPredictorApp(ctk.CTk):
         stereo_text = self.get_stereochemistry(prediction)
         self.lbl_stereo.configure(text=stereo_text)
 
-        # Optional color coding
-        if prediction == "SN2":
-            self.lbl_stereo.configure(text_color="#1f8aa5")
-        elif prediction in ["SN1", "E1"]:
-            self.lbl_stereo.configure(text_color="#a51f1f")
-        elif prediction == "E2":
-            self.lbl_stereo.configure(text_color="#a5501f")
+        # Explain the prediction
+        explanation = explain(inputs, prediction)
+        if "error" in explanation:
+            self.lbl_factors.configure(text="—")
         else:
-            self.lbl_stereo.configure(text_color="#888888")
+            self.lbl_factors.configure(text=self.format_factors(explanation))
+
+        # Optional color coding
+        self.lbl_stereo.configure(text_color=STEREO_COLORS.get(prediction, STEREO_COLORS["No Reaction"]))
 
         # Change color based on result
-        if prediction == "SN1":
-            self.lbl_prediction.configure(text_color="#1f6aa5")
-        elif prediction == "SN2":
-            self.lbl_prediction.configure(text_color="#1f8aa5")
-        elif prediction == "E1":
-            self.lbl_prediction.configure(text_color="#a51f1f")
-        elif prediction == "E2":
-            self.lbl_prediction.configure(text_color="#a5501f")
-        else:  # No Reaction
-            self.lbl_prediction.configure(text_color="#888888")
+        self.lbl_prediction.configure(text_color=MECHANISM_COLORS.get(prediction, MECHANISM_COLORS["No Reaction"]))
 
 
 if __name__ == "__main__":
@@ -0,0 +1,252 @@
+import numpy as np
+from scipy import sparse
+
+from predictor import (MODEL_PATH, ENCODERS_PATH, EXPECTED_COLS, CATEGORICAL_COLS,
+                       load_artifacts, encode_inputs)
+
+TEMPERATURE_INDEX = EXPECTED_COLS.index('Temperature')
+
+
+class ForestExplainer:
+    """
+    Decision-path feature attributions for a trained RandomForestClassifier.
+
+    Every split moves the class distribution from the parent node to the
+    child; that change is credited to the feature the parent split on.
+    Summed along a sample's path and averaged over the trees, this gives
+
+        probabilities = bias + contributions.sum(axis=features)
+
+    exactly, where bias is the forest's mean root distribution.
+
+    The per-node credits for the whole forest are stored in one sparse
+    matrix, so a batch is explained with a single decision_path call and a
+    single sparse matrix product.
+    """
+
+    def __init__(self, model, encoders):
+        self.model = model
+        self.encoders = encoders
+        self.feature_names = list(EXPECTED_COLS)
+        self.class_names = list(encoders['Target_Mechanism'].inverse_transform(model.classes_))
+
+        n_features = len(self.feature_names)
+        n_classes = len(self.class_names)
+        self._n_features = n_features
+        self._n_classes = n_classes
+
+        rows, cols, vals = [], [], []
+        bias = np.zeros(n_classes)
+        offset = 0
+
+        for estimator in model.estimators_:
+            tree = estimator.tree_
+            # Class distribution at every node (normalized in case values are counts)
+            value = tree.value[:, 0, :]
+            value = value / value.sum(axis=1, keepdims=True)
+            bias += value[0]
+
+            parents = np.flatnonzero(tree.children_left >= 0)
+            for children in (tree.children_left[parents], tree.children_right[parents]):
+                delta = value[children] - value[parents]
+                feature = tree.feature[parents]
+                rows.append(np.repeat(children + offset, n_classes))
+                cols.append((feature[:, None] * n_classes + np.arange(n_classes)).ravel())
+                vals.append(delta.ravel())
+
+            offset += tree.node_count
+
+        n_trees = len(model.estimators_)
+        self.bias = bias / n_trees
+        self._node_contributions = sparse.csr_matrix(
+            (np.concatenate(vals) / n_trees, (np.concatenate(rows), np.concatenate(cols))),
+            shape=(offset, n_features * n_classes)
+        )
+
+        # Contribution summed along the path from the root to every node
+        node_delta = self._node_contributions.toarray()
+        self._path_contributions = np.zeros_like(node_delta)
+        offsets = np.cumsum([0] + [e.tree_.node_count for e in model.estimators_])
+        left = np.concatenate([e.tree_.children_left + o for e, o in zip(model.estimators_, offsets)])
+        right = np.concatenate([e.tree_.children_right + o for e, o in zip(model.estimators_, offsets)])
+        is_split = np.concatenate([e.tree_.children_left >= 0 for e in model.estimators_])
+
+        frontier = offsets[:-1]
+        while len(frontier):
+            frontier = frontier[is_split[frontier]]
+            for children in (left[frontier], right[frontier]):
+                self._path_contributions[children] = self._path_contributions[frontier] + node_delta[children]
+            frontier = np.concatenate([left[frontier], right[frontier]])
+
+        # Plain-list copies of the tree structure for the per-combination walk
+        self._trees = [
+            (int(o), e.tree_.feature.tolist(), e.tree_.threshold.tolist(),
+             e.tree_.children_left.tolist(), e.tree_.children_right.tolist())
+            for e, o in zip(model.estimators_, offsets)
+        ]
+
+        # (categorical values) -> (temperature breakpoints, contribution table)
+        self._precomputed = {}
+
+    def explain_encoded(self, X):
+        """
+        Attributions for already-encoded features.
+
+        Args:
+            X (pd.DataFrame): Output of encode_inputs.
+
+        Returns:
+            np.ndarray: Contributions, shape (n_samples, n_features, n_classes).
+        """
+        indicator, _ = self.model.decision_path(X)
+        contributions = indicator @ self._node_contributions
+        return contributions.toarray().reshape(-1, self._n_features, self._n_classes)
+
+    def explain(self, rows):
+        """
+        Attributions for a batch of input dicts (see predict_reaction).
+
+        Returns:
+            np.ndarray: Contributions, shape (n_samples, n_features, n_classes).
+        """
+        return self.explain_encoded(encode_inputs(rows, self.encoders))
+
+    def explain_precomputed(self, rows):
+        """
+        Same result as explain(), served from per-combination tables.
+
+        For a fixed set of categorical values the attributions are piecewise
+        constant in temperature, changing only at the forest's temperature
+        thresholds. The first time a combination is seen its table is built
+        (about a millisecond) and cached; after that each row is a binary
+        search and a copy.
+
+        This is the mode for interactive use and for repeated scoring. For a
+        one-off batch spanning many unseen combinations, explain() is faster.
+        """
+        result = np.empty((len(rows), self._n_features, self._n_classes))
+        if not rows:
+            return result
+
+        df = encode_inputs(rows, self.encoders)
+        combos = df[CATEGORICAL_COLS].to_numpy()
+        temperatures = df['Temperature'].to_numpy(dtype=np.float32).astype(float)
+
+        for i, combo in enumerate(map(tuple, combos)):
+            breakpoints, table = self._combination_table(combo)
+            result[i] = table[np.searchsorted(breakpoints, temperatures[i], side='left')]
+
+        return result
+
+    def precompute(self):
+        """Builds the tables for every categorical combination up front (under a second)."""
+        categories = [range(len(self.encoders[col].classes_)) for col in CATEGORICAL_COLS]
+        for combo in np.array(np.meshgrid(*categories)).reshape(len(categories), -1).T:
+            self._combination_table(tuple(combo))
+
+    def _combination_table(self, combo):
+        combo = tuple(int(v) for v in combo)
+        cached = self._precomputed.get(combo)
+        if cached is not None:
+            return cached
+
+        # Walk only the branches these categorical values can reach, recording
+        # every reachable leaf and the temperature interval (low, high] leading to it
+        leaves, lows, highs = [], [], []
+        thresholds = set()
+        for offset, feature, threshold, left, right in self._trees:
+            stack = [(0, -np.inf, np.inf)]
+            while stack:
+                node, low, high = stack.pop()
+                if left[node] < 0:
+                    leaves.append(node + offset)
+                    lows.append(low)
+                    highs.append(high)
+                    continue
+                f = feature[node]
+                if f == TEMPERATURE_INDEX:
+                    t = threshold[node]
+                    thresholds.add(t)
+                    stack.append((left[node], low, min(high, t)))
+                    stack.append((right[node], max(low, t), high))
+                elif combo[f] <= threshold[node]:
+                    stack.append((left[node], low, high))
+                else:
+                    stack.append((right[node], low, high))
+
+        breakpoints = np.array(sorted(thresholds))
+
+        # Interval k is (breakpoints[k-1], breakpoints[k]]; each leaf covers a run
+        # of intervals, so the table is a cumulative sum of per-leaf start/stop steps
+        first = np.searchsorted(breakpoints, lows, side='right')
+        last = np.searchsorted(breakpoints, highs, side='left')
+        path = self._path_contributions[leaves]
+
+        steps = np.zeros((len(breakpoints) + 2, path.shape[1]))
+        np.add.at(steps, first, path)
+        np.add.at(steps, last + 1, -path)
+        table = np.cumsum(steps[:-1], axis=0).reshape(-1, self._n_features, self._n_classes)
+
+        # Drop breakpoints where nothing changes
+        changed = np.flatnonzero(np.any(np.abs(table[1:] - table[:-1]) > 1e-12, axis=(1, 2)))
+        breakpoints = breakpoints[changed]
+        table = np.concatenate([table[changed], table[-1:]])
+
+        self._precomputed[combo] = (breakpoints, table)
+        return breakpoints, table
+
+
+# (model_path, encoders_path) -> ForestExplainer
+_explainer_cache = {}
+
+
+def get_explainer(model_path=MODEL_PATH, encoders_path=ENCODERS_PATH):
+    """Returns a ForestExplainer for the current model, rebuilding it only when the model changes."""
+    model, encoders = load_artifacts(model_path, encoders_path)
+    explainer = _explainer_cache.get((model_path, encoders_path))
+    if explainer is None or explainer.model is not model or explainer.encoders is not encoders:
+        explainer = ForestExplainer(model, encoders)
+        _explainer_cache[(model_path, encoders_path)] = explainer
+    return explainer
+
+
+def explain_reaction(input_data, mechanism=None, top_n=3, model_path=MODEL_PATH, encoders_path=ENCODERS_PATH):
+    """
+    Explains the prediction for a single reaction.
+
+    Args:
+        input_data (dict): Same format as predict_reaction.
+        mechanism (str): Mechanism to explain, e.g. the prediction being
+            displayed. Defaults to the most probable mechanism.
+        top_n (int): Number of features to return, largest effect first.
+
+    Returns:
+        dict: {
+            'mechanism': str (the mechanism explained),
+            'contributions': [(feature, value, contribution), ...]
+                contribution is the change in probability of that mechanism
+                attributed to the feature
+        }
+    """
+    explainer = get_explainer(model_path, encoders_path)
+    contributions = explainer.explain_precomputed([input_data])[0]
+
+    if mechanism is None:
+        probabilities = explainer.bias + contributions.sum(axis=0)
+        target = int(probabilities.argmax())
+    elif mechanism in explainer.class_names:
+        target = explainer.class_names.index(mechanism)
+    else:
+        raise ValueError(f"Invalid mechanism: {mechanism}. "
+                         f"Expected one of: {explainer.class_names}")
+
+    towards_target = contributions[:, target]
+    order = np.argsort(-np.abs(towards_target))[:top_n]
+
+    return {
+        "mechanism": explainer.class_names[target],
+        "contributions": [
+            (explainer.feature_names[i], input_data[explainer.feature_names[i]], float(towards_target[i]))
+            for i in order
+        ]
+    }
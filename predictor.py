@@ -1,99 +1,148 @@
 import joblib
+import numpy as np
 import pandas as pd
 import os
-import tkinter.messagebox as tkmb
+from query_log import CURVE, get_query_log_path, record_query
 
 MODEL_PATH = 'models/chemistry_model_v2.pkl'
 ENCODERS_PATH = 'models/label_encoders.pkl'
 
+EXPECTED_COLS = [
+    'Substrate_Degree',
+    'Leaving_Group',
+    'Nucleophile',
+    'Solvent_Type',
+    'Steric_Hindrance',
+    'Temperature'
+]
 
-def predict_reaction(input_data, model_path=MODEL_PATH, encoders_path=ENCODERS_PATH):
+CATEGORICAL_COLS = ['Substrate_Degree', 'Leaving_Group', 'Nucleophile',
+                    'Solvent_Type', 'Steric_Hindrance']
+
+# 0.0 to 100.0 °C in 0.1 °C steps (the resolution of the training data)
+TEMPERATURE_GRID = np.round(np.linspace(0.0, 100.0, 1001), 1)
+
+# (model_path, encoders_path) -> (file mtimes, model, encoders)
+_artifact_cache = {}
+
+# (model_path, encoders_path) -> (model, {categorical values: temperature curve})
+_curve_cache = {}
+
+
+def load_artifacts(model_path=MODEL_PATH, encoders_path=ENCODERS_PATH):
     """
-    Predicts the reaction mechanism for a single reaction.
+    Loads the trained model and label encoders.
 
-    Args:
-        input_data (dict): {
-            'Substrate_Degree': str ('Methyl', 'Primary', 'Secondary', 'Tertiary'),
-            'Leaving_Group': str ('F-', 'Cl-', 'Br-', 'I-', 'TsO-'),
-            'Nucleophile': str (e.g., 'OH-', 'Br-', 'CN-'),
-            'Solvent_Type': str ('Polar Protic', 'Polar Aprotic'),
-            'Steric_Hindrance': str ('Low', 'High'),
-            'Temperature': float (0.0 to 100.0)
-        }
-        model_path (str): Path to trained .pkl model.
-        encoders_path (str): Path to saved label encoders.
+    The result is cached and only reloaded when either file changes on disk,
+    so repeated predictions do not pay the unpickling cost.
+
+    Raises FileNotFoundError if either file is missing; callers decide how to
+    report it (the app shows a dialog, replay.py prints it).
 
     Returns:
-        dict: {
-            'prediction': str (e.g., 'SN2', 'E1'),
-            'probabilities': dict
-        }
+        tuple: (model, encoders)
     """
 
     # Check if model exists
     if not os.path.exists(model_path):
-        tkmb.showerror(
-            "Model Not Found",
-            "The required machine learning model could not be found.\n"
-            "Please train the model first using the training script."
-        )
         raise FileNotFoundError(f"Model not found at {model_path}. Train the model first.")
 
     # Check if encoders exist
     if not os.path.exists(encoders_path):
-        tkmb.showerror(
-            "Encoders Not Found",
-            "The required label encoders could not be found.\n"
-            "Please train the model first using the training script."
-        )
         raise FileNotFoundError(f"Encoders not found at {encoders_path}. Train the model first.")
 
-    # Load model and encoders
-    model = joblib.load(model_path)
-    encoders = joblib.load(encoders_path)
-
-    expected_cols = [
-        'Substrate_Degree',
-        'Leaving_Group',
-        'Nucleophile',
-        'Solvent_Type',
-        'Steric_Hindrance',
-        'Temperature'
-    ]
+    key = (model_path, encoders_path)
+    stamp = (os.path.getmtime(model_path), os.path.getmtime(encoders_path))
+    cached = _artifact_cache.get(key)
+
+    if cached is None or cached[0] != stamp:
+        # Load model and encoders
+        cached = (stamp, joblib.load(model_path), joblib.load(encoders_path))
+        _artifact_cache[key] = cached
+
+    return cached[1], cached[2]
+
+
+def encode_inputs(rows, encoders):
+    """
+    Validates and encodes a batch of reaction inputs for the model.
+
+    Args:
+        rows (list): Input dicts in the format accepted by predict_reaction.
+        encoders (dict): Label encoders saved by the training script.
+
+    Returns:
+        pd.DataFrame: Encoded features in EXPECTED_COLS order.
+    """
 
     # Validate input
-    missing = [c for c in expected_cols if c not in input_data]
-    if missing:
-        raise ValueError(f"Missing required fields: {missing}")
+    for input_data in rows:
+        missing = [c for c in EXPECTED_COLS if c not in input_data]
+        if missing:
+            raise ValueError(f"Missing required fields: {missing}")
 
     # Create DataFrame with input data
-    df_predict = pd.DataFrame([input_data])[expected_cols]
+    df_predict = pd.DataFrame(list(rows), columns=EXPECTED_COLS)
 
     # Encode categorical features
-    categorical_cols = ['Substrate_Degree', 'Leaving_Group', 'Nucleophile',
-                        'Solvent_Type', 'Steric_Hindrance']
-
-    for col in categorical_cols:
+    for col in CATEGORICAL_COLS:
         if col in encoders:
             try:
                 df_predict[col] = encoders[col].transform(df_predict[col])
-            except ValueError as e:
-                raise ValueError(f"Invalid value for {col}: {input_data[col]}. "
+            except (ValueError, TypeError):
+                # Unhashable values (e.g. lists) raise TypeError; report them the same way
+                known = set(encoders[col].classes_)
+                invalid = sorted({str(v) for v in df_predict[col] if not (isinstance(v, str) and v in known)})
+                raise ValueError(f"Invalid value for {col}: {', '.join(map(str, invalid))}. "
                                  f"Expected one of: {list(encoders[col].classes_)}")
 
     # Ensure Temperature is float
     df_predict['Temperature'] = df_predict['Temperature'].astype(float)
 
-    # Predict
-    pred_class_encoded = model.predict(df_predict)[0]
+    return df_predict
 
-    # Decode prediction
-    target_encoder = encoders['Target_Mechanism']
-    pred_class = target_encoder.inverse_transform([pred_class_encoded])[0]
+
+def predict_reaction(input_data, model_path=MODEL_PATH, encoders_path=ENCODERS_PATH):
+    """
+    Predicts the reaction mechanism for a single reaction.
+
+    Args:
+        input_data (dict): {
+            'Substrate_Degree': str ('Methyl', 'Primary', 'Secondary', 'Tertiary'),
+            'Leaving_Group': str ('F-', 'Cl-', 'Br-', 'I-', 'TsO-'),
+            'Nucleophile': str (e.g., 'OH-', 'Br-', 'CN-'),
+            'Solvent_Type': str ('Polar Protic', 'Polar Aprotic'),
+            'Steric_Hindrance': str ('Low', 'High'),
+            'Temperature': float (0.0 to 100.0)
+        }
+        model_path (str): Path to trained .pkl model.
+        encoders_path (str): Path to saved label encoders.
+
+    Returns:
+        dict: {
+            'prediction': str (e.g., 'SN2', 'E1'),
+            'probabilities': dict
+        }
+    """
+
+    model, encoders = load_artifacts(model_path, encoders_path)
+
+    df_predict = encode_inputs([input_data], encoders)
+
+    # Record the request if query logging is enabled (CHEMPREDICT_QUERY_LOG),
+    # using the validated values so logging cannot reject a valid prediction
+    log_path = get_query_log_path()
+    if log_path:
+        record_query(dict(input_data, Temperature=float(df_predict['Temperature'].iloc[0])), log_path)
 
     # Predict probabilities
     prob_values = model.predict_proba(df_predict)[0]
 
+    # Decode prediction (same argmax rule as model.predict)
+    target_encoder = encoders['Target_Mechanism']
+    pred_class_encoded = model.classes_[prob_values.argmax()]
+    pred_class = target_encoder.inverse_transform([pred_class_encoded])[0]
+
     # Decode class names for probabilities
     prob_dict = {}
     for i, class_name in enumerate(target_encoder.classes_):
@@ -105,6 +154,73 @@ def predict_reaction(input_data, model_path=MODEL_PATH, encoders_path=ENCODERS_P
     }
 
 
+def predict_temperature_curve(conditions, model_path=MODEL_PATH, encoders_path=ENCODERS_PATH):
+    """
+    Predicts class probabilities across the whole temperature range for one
+    combination of categorical conditions, in a single batched call.
+
+    Curves are cached per combination and dropped when the model is reloaded.
+
+    Args:
+        conditions (dict): Same keys as predict_reaction, without 'Temperature'.
+        model_path (str): Path to trained .pkl model.
+        encoders_path (str): Path to saved label encoders.
+
+    Returns:
+        dict: {
+            'temperatures': np.ndarray (TEMPERATURE_GRID),
+            'classes': list of mechanism names,
+            'probabilities': np.ndarray, shape (len(temperatures), len(classes)),
+            'predictions': list of the predicted mechanism at each temperature,
+            'crossovers': list of (temperature, from_mechanism, to_mechanism)
+        }
+    """
+
+    model, encoders = load_artifacts(model_path, encoders_path)
+
+    key = (model_path, encoders_path)
+    if key not in _curve_cache or _curve_cache[key][0] is not model:
+        _curve_cache[key] = (model, {})
+    curves = _curve_cache[key][1]
+
+    # Validate before building the cache key; the encoded values are hashable
+    encoded = encode_inputs([dict(conditions, Temperature=0.0)], encoders)
+    combo = tuple(int(v) for v in encoded[CATEGORICAL_COLS].iloc[0])
+    if combo not in curves:
+        curves[combo] = _compute_temperature_curve(model, encoders, conditions)
+
+    # Record the request if query logging is enabled (CHEMPREDICT_QUERY_LOG)
+    log_path = get_query_log_path()
+    if log_path:
+        record_query(conditions, log_path, kind=CURVE)
+
+    return curves[combo]
+
+
+def _compute_temperature_curve(model, encoders, conditions):
+    """Scores every TEMPERATURE_GRID point for one combination in a single predict_proba call."""
+    rows = [dict(conditions, Temperature=t) for t in TEMPERATURE_GRID]
+    probabilities = model.predict_proba(encode_inputs(rows, encoders))
+
+    classes = list(encoders['Target_Mechanism'].inverse_transform(model.classes_))
+    best = probabilities.argmax(axis=1)
+    predictions = [classes[i] for i in best]
+
+    # Temperatures at which the predicted mechanism changes
+    crossovers = [
+        (float(TEMPERATURE_GRID[i]), predictions[i - 1], predictions[i])
+        for i in np.flatnonzero(best[1:] != best[:-1]) + 1
+    ]
+
+    return {
+        "temperatures": TEMPERATURE_GRID,
+        "classes": classes,
+        "probabilities": probabilities,
+        "predictions": predictions,
+        "crossovers": crossovers
+    }
+
+
 # # Example usage
 # example_input = {
 #         'Substrate_Degree': 'Tertiary',
@@ -0,0 +1,129 @@
+import json
+import math
+import os
+import threading
+import time
+import warnings
+
+# Set this environment variable to a file path to record every prediction request
+QUERY_LOG_ENV = 'CHEMPREDICT_QUERY_LOG'
+
+QUERY_FIELDS = [
+    'Substrate_Degree',
+    'Leaving_Group',
+    'Nucleophile',
+    'Solvent_Type',
+    'Steric_Hindrance',
+    'Temperature'
+]
+
+# Entry kinds: a single prediction, or a full temperature curve for one set of conditions
+PREDICT = 'predict'
+CURVE = 'curve'
+
+_write_lock = threading.Lock()
+
+# Log paths that failed to open; each is warned about once and then skipped
+_failed_paths = set()
+
+# Log paths already warned about an entry that could not be built
+_entry_warned_paths = set()
+
+
+def normalize_query(input_data):
+    """
+    Reduces a prediction input to a compact, comparable form.
+
+    Categorical values are stripped of surrounding whitespace and the
+    temperature is rounded to 0.1 °C (the resolution of the training data),
+    so equivalent requests produce identical tuples.
+
+    Returns:
+        tuple: (substrate, leaving_group, nucleophile, solvent, steric, temperature)
+    """
+    return normalize_conditions(input_data) + (round(float(input_data['Temperature']), 1),)
+
+
+def normalize_conditions(conditions):
+    """
+    Same as normalize_query for the categorical conditions only (curve requests).
+
+    Returns:
+        tuple: (substrate, leaving_group, nucleophile, solvent, steric)
+    """
+    return tuple(str(conditions[col]).strip() for col in QUERY_FIELDS[:-1])
+
+
+def get_query_log_path():
+    """Returns the query log path if recording is enabled, otherwise None."""
+    return os.environ.get(QUERY_LOG_ENV) or None
+
+
+def record_query(input_data, log_path, kind=PREDICT):
+    """
+    Appends one normalized query to the log as a single JSON line:
+    {"t": <unix timestamp>, "q": [substrate, lg, nucleophile, solvent, steric, temp]}
+
+    Curve requests (kind=CURVE) have no temperature and are tagged:
+    {"t": <unix timestamp>, "k": "curve", "q": [substrate, lg, nucleophile, solvent, steric]}
+
+    A missing (NaN) temperature is written as null.
+
+    Recording never fails the caller: if the log cannot be written, a warning
+    is issued once and further queries for that path are dropped. An entry
+    that cannot be built is skipped, with a warning the first time.
+    """
+    if log_path in _failed_paths:
+        return
+
+    try:
+        if kind == CURVE:
+            entry = {"t": round(time.time(), 4), "k": CURVE, "q": list(normalize_conditions(input_data))}
+        else:
+            values = list(normalize_query(input_data))
+            if math.isnan(values[-1]):
+                values[-1] = None
+            entry = {"t": round(time.time(), 4), "q": values}
+        line = json.dumps(entry, separators=(',', ':'), allow_nan=False) + '\n'
+    except Exception as e:
+        if log_path not in _entry_warned_paths:
+            _entry_warned_paths.add(log_path)
+            warnings.warn(f"Query not logged, cannot build log entry for {input_data!r}: {e}")
+        return
+
+    with _write_lock:
+        try:
+            with open(log_path, 'a', encoding='utf-8') as f:
+                f.write(line)
+        except OSError as e:
+            _failed_paths.add(log_path)
+            warnings.warn(f"Query logging disabled, cannot write to {log_path}: {e}")
+
+
+def read_query_log(log_path):
+    """
+    Reads a query log written by record_query.
+
+    Returns:
+        list: [(timestamp, kind, input_data dict), ...] in recorded order.
+            kind is PREDICT or CURVE; curve entries have no 'Temperature'.
+    """
+    queries = []
+    with open(log_path, 'r', encoding='utf-8') as f:
+        for line_no, line in enumerate(f, start=1):
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                entry = json.loads(line)
+                kind = entry.get('k', PREDICT)
+                fields = QUERY_FIELDS[:-1] if kind == CURVE else QUERY_FIELDS
+                if kind not in (PREDICT, CURVE) or len(entry['q']) != len(fields):
+                    raise ValueError
+                input_data = dict(zip(fields, entry['q']))
+                if kind == PREDICT and input_data['Temperature'] is None:
+                    input_data['Temperature'] = float('nan')
+                queries.append((float(entry['t']), kind, input_data))
+            except (ValueError, KeyError, TypeError):
+                raise ValueError(f"Malformed query log entry on line {line_no}: {line}")
+    return queries
@@ -0,0 +1,397 @@
+"""
+Replays a recorded query log against the predictor and reports throughput,
+latency percentiles and cache-hit potential.
+
+Record a log by running the app (or any caller of predict_reaction or
+predict_temperature_curve) with CHEMPREDICT_QUERY_LOG set, e.g.:
+
+    CHEMPREDICT_QUERY_LOG=logs/queries.jsonl python app.py
+
+Then replay it:
+
+    python replay.py logs/queries.jsonl                       # in-process, original timing
+    python replay.py logs/queries.jsonl --speed 4             # 4x faster than recorded
+    python replay.py logs/queries.jsonl --speed max --mode pool --workers 8
+    python replay.py logs/queries.jsonl --mode http           # local HTTP stand-in
+"""
+import argparse
+import json
+import os
+import threading
+import time
+import urllib.error
+import urllib.request
+import warnings
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, wait
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import numpy as np
+
+from predictor import predict_reaction, predict_temperature_curve
+from query_log import QUERY_LOG_ENV, CURVE, normalize_conditions, normalize_query, read_query_log
+
+
+# --- Local HTTP stand-in ---
+class PredictorRequestHandler(BaseHTTPRequestHandler):
+    """Serves POST /predict (input_data) and POST /curve (conditions) with JSON bodies."""
+
+    def do_POST(self):
+        if self.path not in ('/predict', '/curve'):
+            self.send_error(404)
+            return
+
+        try:
+            length = int(self.headers.get('Content-Length', 0))
+            input_data = json.loads(self.rfile.read(length))
+            if self.path == '/curve':
+                curve = predict_temperature_curve(input_data)
+                body = {
+                    "classes": curve["classes"],
+                    "probabilities": curve["probabilities"].tolist(),
+                    "crossovers": curve["crossovers"]
+                }
+            else:
+                result = predict_reaction(input_data)
+                body = {
+                    "prediction": str(result["prediction"]),
+                    "probabilities": {k: float(v) for k, v in result["probabilities"].items()}
+                }
+            status = 200
+        except Exception as e:
+            body = {"error": str(e)}
+            status = 400
+
+        payload = json.dumps(body).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def log_message(self, format, *args):
+        # Keep replay output readable
+        pass
+
+
+def start_http_standin(host='127.0.0.1', port=0):
+    """Starts the HTTP stand-in on a background thread and returns (server, base_url)."""
+    server = ThreadingHTTPServer((host, port), PredictorRequestHandler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    return server, f"http://{host}:{server.server_address[1]}"
+
+
+# --- Request drivers ---
+def _run_in_process(kind, input_data):
+    """Returns the service time (seconds) measured where the request runs."""
+    t0 = time.perf_counter()
+    if kind == CURVE:
+        predict_temperature_curve(input_data)
+    else:
+        predict_reaction(input_data)
+    return time.perf_counter() - t0
+
+
+def _describe_error(error):
+    return f"{type(error).__name__}: {error}"
+
+
+def _record_failure(failures, error):
+    """Counts failures per exception type, keeping the first message of each."""
+    name = type(error).__name__
+    count, message = failures.get(name, (0, _describe_error(error)))
+    failures[name] = (count + 1, message)
+
+
+def _warm_up(kind, input_data, quiet=False):
+    """
+    Loads the model before timing; a bad query must not break the pool.
+
+    Returns the failure description (or None), warning about it unless quiet.
+    """
+    try:
+        _run_in_process(kind, input_data)
+    except Exception as e:
+        if not quiet:
+            warnings.warn(f"Warm-up request failed: {_describe_error(e)}")
+        return _describe_error(e)
+    return None
+
+
+def _ping():
+    pass
+
+
+def _run_over_http(base_url, kind, input_data):
+    """Returns the service time (seconds) of one request as seen by the worker thread."""
+    t0 = time.perf_counter()
+    request = urllib.request.Request(
+        f"{base_url}/{kind}",
+        data=json.dumps(input_data).encode('utf-8'),
+        headers={'Content-Type': 'application/json'}
+    )
+    try:
+        with urllib.request.urlopen(request) as response:
+            body = json.loads(response.read())
+    except urllib.error.HTTPError as e:
+        # The stand-in reports failures as {"error": ...} with a 4xx status
+        try:
+            message = json.loads(e.read())["error"]
+        except Exception:
+            message = e.reason
+        raise RuntimeError(f"HTTP {e.code}: {message}")
+    if "error" in body:
+        raise RuntimeError(body["error"])
+    return time.perf_counter() - t0
+
+
+def build_schedule(queries, speed):
+    """
+    Returns the send offset (seconds from start) of each query.
+
+    speed=1.0 keeps the recorded spacing, speed=2.0 halves it and
+    speed=None sends everything as fast as possible.
+    """
+    if speed is None or not queries:
+        return [0.0] * len(queries)
+
+    start = queries[0][0]
+    return [max(0.0, (t - start) / speed) for t, _, _ in queries]
+
+
+def cache_hit_potential(queries):
+    """
+    Fraction of queries that repeat an earlier normalized query, i.e. the hit
+    rate an unbounded result cache would have achieved on this workload.
+    """
+    if not queries:
+        return 0.0, 0
+
+    unique = len({
+        (kind, normalize_conditions(q) if kind == CURVE else normalize_query(q))
+        for _, kind, q in queries
+    })
+    return 1.0 - unique / len(queries), unique
+
+
+def replay(queries, mode='inline', speed=1.0, workers=4, url=None):
+    """
+    Drives the predictor with the recorded queries.
+
+    Query logging (CHEMPREDICT_QUERY_LOG) is disabled while replaying, so
+    the replayed traffic is never recorded back into a log.
+
+    With a speed factor the replay is open-loop: each query is sent at its
+    (scaled) recorded time whether or not earlier ones have finished. With
+    speed=None it is closed-loop: `workers` requests are kept in flight
+    (one in inline mode), which measures maximum sustainable throughput.
+
+    Args:
+        queries (list): Output of read_query_log.
+        mode (str): 'inline' (this process), 'pool' (process pool) or 'http'.
+        speed (float or None): Replay speed factor, None for maximum rate.
+        workers (int): Concurrency for 'pool' and 'http' modes.
+        url (str): Base URL of the predictor service for 'http' mode.
+
+    Returns:
+        dict: {
+            'service': [...seconds spent executing each request],
+            'wait': [...seconds between the send time and execution starting],
+            'errors': int,
+            'failures': {exception type: (count, first message)},
+            'wall_time': float
+        }
+    """
+    if not queries:
+        return {"service": [], "wait": [], "errors": 0, "failures": {}, "wall_time": 0.0}
+
+    # Never record the replayed traffic back into a query log; pool workers
+    # inherit the cleared environment
+    log_path = os.environ.pop(QUERY_LOG_ENV, None)
+    try:
+        return _replay(queries, mode, speed, workers, url)
+    finally:
+        if log_path is not None:
+            os.environ[QUERY_LOG_ENV] = log_path
+
+
+def _replay(queries, mode, speed, workers, url):
+    schedule = build_schedule(queries, speed)
+    service = []
+    waits = []
+    errors = 0
+    failures = {}
+
+    if mode == 'inline':
+        # Load the model before timing starts, as the pool and http modes do
+        _warm_up(*queries[0][1:])
+
+        start = time.perf_counter()
+        for offset, (_, kind, input_data) in zip(schedule, queries):
+            sent_at = start + offset
+            delay = sent_at - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+            if speed is None:
+                sent_at = time.perf_counter()
+
+            queued = time.perf_counter() - sent_at
+            try:
+                service_time = _run_in_process(kind, input_data)
+            except Exception as e:
+                errors += 1
+                _record_failure(failures, e)
+                continue
+            service.append(service_time)
+            waits.append(queued)
+
+        return {"service": service, "wait": waits, "errors": errors, "failures": failures,
+                "wall_time": time.perf_counter() - start}
+
+    if mode == 'pool':
+        # The initializer warms up every worker process, including any started later
+        executor = ProcessPoolExecutor(max_workers=workers, initializer=_warm_up,
+                                       initargs=queries[0][1:] + (True,))
+        task = _run_in_process
+    elif mode == 'http':
+        executor = ThreadPoolExecutor(max_workers=workers)
+        task = lambda kind, input_data: _run_over_http(url, kind, input_data)
+    else:
+        raise ValueError(f"Unknown replay mode: {mode}")
+
+    lock = threading.Lock()
+    results = []
+    # Closed loop: a slot is taken per request in flight and freed when it completes
+    slots = threading.Semaphore(workers)
+
+    def on_done(future, sent_at):
+        # Response time is measured by this process; the task reports its own
+        # service time, and the difference is time spent queued or in transit
+        response_time = time.perf_counter() - sent_at
+        if speed is None:
+            slots.release()
+        with lock:
+            if future.exception() is None:
+                results.append((future.result(), response_time))
+            else:
+                results.append(future.exception())
+
+    with executor:
+        if mode == 'pool':
+            # Start all workers so process start-up is not counted as latency,
+            # then report a warm-up failure once rather than from every worker
+            wait([executor.submit(_ping) for _ in range(workers)])
+            error = executor.submit(_warm_up, *queries[0][1:], True).result()
+            if error:
+                warnings.warn(f"Warm-up request failed: {error}")
+        elif mode == 'http':
+            # Let the server load the model before timing starts
+            try:
+                task(*queries[0][1:])
+            except Exception as e:
+                warnings.warn(f"Warm-up request failed: {_describe_error(e)}")
+
+        start = time.perf_counter()
+        for offset, (_, kind, input_data) in zip(schedule, queries):
+            if speed is None:
+                slots.acquire()
+                sent_at = time.perf_counter()
+            else:
+                sent_at = start + offset
+                delay = sent_at - time.perf_counter()
+                if delay > 0:
+                    time.sleep(delay)
+            future = executor.submit(task, kind, input_data)
+            future.add_done_callback(lambda f, s=sent_at: on_done(f, s))
+
+    wall_time = time.perf_counter() - start
+
+    for result in results:
+        if isinstance(result, BaseException):
+            errors += 1
+            _record_failure(failures, result)
+            continue
+        service_time, response_time = result
+        service.append(service_time)
+        waits.append(max(0.0, response_time - service_time))
+
+    return {"service": service, "wait": waits, "errors": errors, "failures": failures,
+            "wall_time": wall_time}
+
+
+def _print_percentiles(label, seconds):
+    p50, p95, p99 = np.percentile(np.array(seconds) * 1000.0, [50, 95, 99])
+    print(f"{label:<17}p50 {p50:.2f} ms   p95 {p95:.2f} ms   p99 {p99:.2f} ms")
+
+
+def print_report(queries, stats, mode, speed):
+    completed = len(stats["service"])
+    hit_rate, unique = cache_hit_potential(queries)
+
+    print(f"Mode:            {mode}")
+    print(f"Speed:           {'max (closed loop)' if speed is None else f'{speed:g}x'}")
+    curves = sum(1 for _, kind, _ in queries if kind == CURVE)
+    print(f"Queries:         {len(queries)} ({unique} unique; "
+          f"{len(queries) - curves} predictions, {curves} curves)")
+    print(f"Completed:       {completed}")
+    print(f"Errors:          {stats['errors']}")
+    for count, message in stats["failures"].values():
+        print(f"  {count} x {message}")
+    print(f"Wall time:       {stats['wall_time']:.2f} s")
+    if stats['wall_time'] > 0:
+        print(f"Throughput:      {completed / stats['wall_time']:.1f} req/s")
+
+    if completed:
+        _print_percentiles("Service time:", stats["service"])
+        _print_percentiles("Queue wait:", stats["wait"])
+        response = np.array(stats["service"]) + np.array(stats["wait"])
+        _print_percentiles("Response time:", response)
+
+    print(f"Cache-hit potential: {hit_rate * 100:.1f}%")
+
+
+def parse_speed(value):
+    if value == 'max':
+        return None
+    speed = float(value)
+    if speed <= 0:
+        raise argparse.ArgumentTypeError("speed must be positive or 'max'")
+    return speed
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Replay a recorded query log against the predictor.")
+    parser.add_argument('log', help="Query log written with CHEMPREDICT_QUERY_LOG enabled")
+    parser.add_argument('--mode', choices=['inline', 'pool', 'http'], default='inline',
+                        help="Drive the predictor in-process, across a process pool, or over HTTP")
+    parser.add_argument('--speed', type=parse_speed, default=1.0,
+                        help="Replay speed factor (1 = original timing) or 'max'")
+    parser.add_argument('--workers', type=int, default=4,
+                        help="Concurrent workers for pool and http modes")
+    parser.add_argument('--url', default=None,
+                        help="Base URL serving /predict and /curve for http mode "
+                             "(default: start a local stand-in)")
+    args = parser.parse_args()
+
+    queries = read_query_log(args.log)
+    if not queries:
+        print(f"No queries found in {args.log}")
+        return
+
+    server = None
+    url = args.url
+    if args.mode == 'http' and url is None:
+        server, url = start_http_standin()
+        print(f"Started local predictor stand-in at {url}")
+
+    try:
+        stats = replay(queries, mode=args.mode, speed=args.speed, workers=args.workers, url=url)
+    finally:
+        if server is not None:
+            server.shutdown()
+
+    print_report(queries, stats, args.mode, args.speed)
+
+
+if __name__ == "__main__":
+    main()